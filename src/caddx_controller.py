@@ -1,8 +1,10 @@
-from typing import NamedTuple, Dict, Callable, Optional
+from typing import NamedTuple, Dict, Callable, Final, Optional
 from types import MappingProxyType
 from enum import IntEnum
+import itertools
 import logging
 import serial
+import struct
 import queue
 import time
 import datetime
@@ -14,21 +16,25 @@ from partition import Partition
 logger = logging.getLogger("app.caddx_controller")
 
 
-def get_nth_bit(num: int, n: int) -> int:
-    return (num >> n) & 1
+def get_nth_bit(num: int, n: int, _bits=tuple(1 << i for i in range(64))) -> int:
+    # The bit table is bound as a default so the lookup is a local load rather than a shift.
+    return 1 if num & _bits[n] else 0
+
+
+# Hex padding for each valid PIN length, so a 4-digit PIN still fills the 3 PIN bytes.
+_PIN_PADDING: Final = {4: "00", 6: ""}
 
 
 def pin_to_bytearray(pin: str) -> bytearray:
-    if len(pin) not in [4, 6]:
+    padding = _PIN_PADDING.get(len(pin))
+    if padding is None:
         raise ValueError("PIN must be 4 or 6 characters long")
 
-    pin_array = bytearray(3)
-
-    for i in range(0, len(pin), 2):
-        byte = (int(pin[i]) << 4) | int(pin[i + 1])
-        pin_array[i // 2] = byte
+    if not pin.isdigit():
+        raise ValueError("PIN must contain only digits")
 
-    return pin_array
+    # Each decimal digit is a nibble, so the PIN reads directly as hex.
+    return bytearray(bytes.fromhex(pin + padding))
 
 
 class StopThread(Exception):
@@ -129,6 +135,13 @@ MessageValidLength = MappingProxyType(
 )
 
 
+# Little-endian field layouts of fixed-size panel messages, starting at the message type byte.
+# Zone Status: type, zone, partition mask, type mask (3 bytes, read as 16 + 8 bits), condition mask.
+ZoneStatusRspStruct = struct.Struct("<xxBHBH")
+# Partition Status: type, partition, condition flags bytes 1-4, last user (skipped), condition flags bytes 5-6.
+PartitionStatusRspStruct = struct.Struct("<xxIxH")
+
+
 class Command(NamedTuple):
     req_msg_type: MessageType
     req_msg_data: Optional[bytearray] = None
@@ -369,7 +382,7 @@ class CaddxController:
         # Check the checksum
         offered_checksum = int.from_bytes(message_data[-2:], byteorder="little")
         del message_data[-2:]  # Strip off the checksum
-        calculated_checksum = self._calculate_fletcher16(message_data)
+        calculated_checksum = _fletcher16(message_data)
         if offered_checksum != calculated_checksum:
             logger.error("Invalid checksum. Discarding message.")
             return None
@@ -383,11 +396,10 @@ class CaddxController:
         :param data: The data to be checksummed.
         :return: 16-bit checksum.
         """
-        sum1 = int(0)
-        sum2 = int(0)
-        for byte in data:
-            sum1 = (sum1 + byte) % 255
-            sum2 = (sum2 + sum1) % 255
+        # sum2 is the sum of the running sum1 values. Python ints cannot overflow, so the
+        #  modulo only needs to be applied once at the end.
+        sum1 = sum(data) % 255
+        sum2 = sum(itertools.accumulate(data)) % 255
         return (sum2 << 8) | sum1
 
     def _process_transition_message(self, received_message: bytearray) -> None:
@@ -574,12 +586,12 @@ class CaddxController:
             logger.error(f"Ignoring zone status. Unknown zone index: {zone_index}")
             return
         logger.debug(f"Got status for zone {zone_index} - {zone.name}.")
-        partition_mask = int.from_bytes(message[2:3], byteorder="little")
-        type_mask = int.from_bytes(message[3:6], byteorder="little")
-        condition_mask = int.from_bytes(message[6:8], byteorder="little")
+        partition_mask, type_mask_low, type_mask_high, condition_mask = (
+            ZoneStatusRspStruct.unpack(message)
+        )
         zone.set_masks(
             partition_mask=partition_mask,
-            type_mask=type_mask,
+            type_mask=type_mask_low | (type_mask_high << 16),
             condition_mask=condition_mask,
         )
         if self.panel_synced:
@@ -603,9 +615,8 @@ class CaddxController:
             logger.error("Invalid z snapshot message.")
             return
         zone_index = int(message[1]) * 16
-        for i in range(2, len(message)):
-            zone_mask = int(message[i])
-            for bit in [0, 4]:
+        for zone_mask in message[2:]:
+            for bit in (0, 4):
                 if (zone := Zone.get_zone_by_index(zone_index)) is not None:
                     _update_zone_attr(zone, zone_mask, bit)
                 zone_index += 1
@@ -629,13 +640,10 @@ class CaddxController:
                 )
                 return
 
-        condition_flags_low = (
-            int.from_bytes(message[2:6], byteorder="little") & 0xFF_FF_FF_FF
+        condition_flags_low, condition_flags_high = PartitionStatusRspStruct.unpack(
+            message
         )
-        condition_flags_high = (
-            int.from_bytes(message[7:9], byteorder="little") & 0xFF_FF
-        ) << 32
-        partition.condition_flags = condition_flags_low | condition_flags_high
+        partition.condition_flags = condition_flags_low | (condition_flags_high << 32)
         partition.log_condition(logger.debug)
         logger.debug(f"Partition {partition.index} state is {partition.state.name}")
         if self.panel_synced:
@@ -773,20 +781,14 @@ class CaddxController:
         message.append(message_type & 0xFF)
         if message_data:
             message.extend(message_data)
-        checksum = self._calculate_fletcher16(message)
+        checksum = _fletcher16(message)
         message.extend(checksum.to_bytes(2, byteorder="little"))
 
-        message_stuffed = bytearray()
-        for i in message:
-            if i == 0x7E:
-                message_stuffed.extend(b"\x7d\x5e")
-            elif i == 0x7D:
-                message_stuffed.extend(b"\x7d\x5d")
-            else:
-                message_stuffed.append(i)
-
-        # Add the start byte
-        message_stuffed[0:0] = b"\x7e"
+        # Byte stuffing is done with C-level scans rather than a per-byte loop.
+        # 0x7D must be escaped first so the escapes inserted for 0x7E are left alone.
+        message_stuffed = b"\x7e" + message.replace(b"\x7d", b"\x7d\x5d").replace(
+            b"\x7e", b"\x7d\x5e"
+        )
 
         logger.debug(f"Sending message: {message_stuffed.hex()}")
         self.conn.write(message_stuffed)
@@ -813,7 +815,7 @@ class CaddxController:
         zone_index = (zone - 1) & 0xFF
         command = Command(
             MessageType.ZoneNameReq,
-            bytearray(zone_index.to_bytes(1, byteorder="little")),
+            bytearray((zone_index,)),
             {MessageType.ZoneNameRsp: self._process_zone_name_rsp},
         )
         self._send_request_to_queue(command)
@@ -823,7 +825,7 @@ class CaddxController:
         zone_index = (zone - 1) & 0xFF
         command = Command(
             MessageType.ZoneStatusReq,
-            bytearray(zone_index.to_bytes(1, byteorder="little")),
+            bytearray((zone_index,)),
             {MessageType.ZoneStatusRsp: self._process_zone_status_rsp},
         )
         self._send_request_to_queue(command)
@@ -834,7 +836,7 @@ class CaddxController:
         partition = partition - 1
         command = Command(
             MessageType.PartitionStatusReq,
-            bytearray(partition.to_bytes(1, byteorder="little")),
+            bytearray((partition,)),
             {MessageType.PartitionStatusRsp: self._process_partition_status_rsp},
         )
         self._send_request_to_queue(command)
@@ -873,8 +875,7 @@ class CaddxController:
     ) -> None:
         message = bytearray()
         message.append(function.value)
-        partition_mask = 1 << (partition.index - 1)
-        message.append(partition_mask)
+        message.append(partition.mask_bit)
         message.append(int(self.default_user))  # Default to User 1 for now.
         logger.debug(
             "Queuing send primary keypad function wo PIN with function "
@@ -895,8 +896,7 @@ class CaddxController:
         pin_array = pin_to_bytearray(self.default_code)
         message.extend(pin_array)
         message.append(function.value)
-        partition_mask = 1 << (partition.index - 1)
-        message.append(partition_mask)
+        message.append(partition.mask_bit)
         logger.debug(
             "Queuing send primary keypad function with PIN with function "
             f"{function.name} on partition {partition.index}"
@@ -970,3 +970,7 @@ class CaddxController:
             else:
                 logger.debug(f"Not requesting zone {zone_number}. Ignored")
         return
+
+
+# Module-level alias so the receive and send paths resolve the checksum with a global lookup.
+_fletcher16 = CaddxController._calculate_fletcher16
@@ -1,15 +1,30 @@
 import time
-from typing import List
+from typing import Callable, Dict, NamedTuple, Tuple
 import json
 import logging
+import re
+import sys
 import paho.mqtt.client as mqtt
 
 from partition import Partition
-from zone import Zone
+from zone import Zone, ZoneStatePayload
 
 logger = logging.getLogger("app.mqtt_client")
 
 
+class PartitionTopics(NamedTuple):
+    base: str
+    state: str
+    config: str
+
+
+class ZoneTopics(NamedTuple):
+    state: str
+    config_bypass: str
+    config_faulted: str
+    config_trouble: str
+
+
 class MQTTClient(object):
     def __init__(
         self,
@@ -27,8 +42,9 @@ class MQTTClient(object):
         timeout_seconds: int = 60,
     ):
         self.software_version = version
-        self.topic_root = topic_root
-        self.panel_unique_id = panel_unique_id
+        # Interned since these are repeated in every topic and unique_id we publish.
+        self.topic_root = sys.intern(topic_root)
+        self.panel_unique_id = sys.intern(panel_unique_id)
         self.panel_name = panel_name
         self.topic_prefix_panel = (
             f"{self.topic_root}/alarm_control_panel/{self.panel_unique_id}"
@@ -40,7 +56,28 @@ class MQTTClient(object):
         )
         self.state_topic_path_zones = f"{self.topic_prefix_zones}/+/state"
         self.availability_topic = f"{self.topic_prefix_panel}/availability"
+        self.status_topic = f"{self.topic_root}/status"
+        # Matches partition command topics and captures the partition number.
+        self.command_topic_re = re.compile(
+            re.escape(self.topic_prefix_panel) + r"/partition_(\d+)/set"
+        )
+        # Per-object topics never change once built, so they are cached by index.
+        self._partition_topics: Dict[int, PartitionTopics] = {}
+        self._zone_topics: Dict[int, ZoneTopics] = {}
+        # Discovery configs are static once the panel is synchronized, so they are
+        #  serialized on first publish and reused when HA restarts.
+        self._partition_configs: Dict[int, bytes] = {}
+        self._zone_configs: Dict[int, Tuple[bytes, bytes, bytes]] = {}
+        # Last state published for each zone and partition, so unchanged reports are not re-sent.
+        self._zone_published_states: Dict[int, ZoneStatePayload] = {}
+        self._partition_published_states: Dict[int, Partition.State] = {}
         self.caddx_ctrl = caddx_ctrl
+        # Keyed by raw payload so commands are dispatched without decoding.
+        self._command_handlers: Dict[bytes, Callable[[Partition], None]] = {
+            b"ARM_AWAY": caddx_ctrl.send_arm_away,
+            b"ARM_HOME": caddx_ctrl.send_arm_home,
+            b"DISARM": caddx_ctrl.send_disarm,
+        }
         self.timeout_seconds = timeout_seconds
         self.client = mqtt.Client()
         self.connected = False
@@ -72,7 +109,7 @@ class MQTTClient(object):
             self.client.subscribe(self.command_topic_path_panel)
 
             # Subscribe to HA MQTT integration status to detect HA restarts
-            self.client.subscribe(f"{self.topic_root}/status")
+            self.client.subscribe(self.status_topic)
 
         else:
             self.connected = False
@@ -82,12 +119,7 @@ class MQTTClient(object):
         if not self.connected:
             return
         # Check for MQTT integration availability message
-        topic_parts: List[str] = msg.topic.split("/")
-        if (
-            len(topic_parts) == 2
-            and topic_parts[0] == self.topic_root
-            and topic_parts[1] == "status"
-        ):
+        if msg.topic == self.status_topic:
             if msg.payload == b"online":
                 logger.info("MQTT integration restarted. Re-synchronizing data.")
                 self.publish_configs()
@@ -95,35 +127,45 @@ class MQTTClient(object):
                 self.publish_partition_states()
             return
         # Check for command.
-        if (
-            (len(topic_parts) == 5)
-            and (topic_parts[0] == self.topic_root)
-            and (topic_parts[1] == "alarm_control_panel")
-            and (topic_parts[2] == self.panel_unique_id)
-            and (topic_parts[3].startswith("partition_"))
-            and (topic_parts[4] == "set")
-        ):
-            partition_index = int(topic_parts[3].split("_")[1])
+        if (topic_match := self.command_topic_re.fullmatch(msg.topic)) is not None:
+            partition_index = int(topic_match.group(1))
             partition = Partition.get_partition_by_index(partition_index)
             if partition is None:
                 logger.error(
                     f"Got command for partition {partition_index} that is not configured."
                 )
                 return
-            command = msg.payload.decode("utf-8")
-            match command:
-                case "ARM_AWAY":
-                    self.caddx_ctrl.send_arm_away(partition)
-                case "ARM_HOME":
-                    self.caddx_ctrl.send_arm_home(partition)
-                case "DISARM":
-                    self.caddx_ctrl.send_disarm(partition)
-                case _:
-                    logger.error(f"Unknown command: {command}")
+            handler = self._command_handlers.get(msg.payload)
+            if handler is None:
+                command = msg.payload.decode("utf-8", errors="replace")
+                logger.error(f"Unknown command: {command}")
+                return
+            handler(partition)
 
     def on_disconnect(self, _client, _userdata, _rc) -> None:
         self.connected = False
 
+    def _get_partition_topics(self, partition: Partition) -> PartitionTopics:
+        topics = self._partition_topics.get(partition.index)
+        if topics is None:
+            base = f"{self.topic_prefix_panel}/{partition.unique_name}"
+            topics = PartitionTopics(base, f"{base}/state", f"{base}/config")
+            self._partition_topics[partition.index] = topics
+        return topics
+
+    def _get_zone_topics(self, zone: Zone) -> ZoneTopics:
+        topics = self._zone_topics.get(zone.index)
+        if topics is None:
+            base = f"{self.topic_prefix_zones}/{zone.unique_name}"
+            topics = ZoneTopics(
+                f"{base}/state",
+                f"{base}_bypass/config",
+                f"{base}_faulted/config",
+                f"{base}_trouble/config",
+            )
+            self._zone_topics[zone.index] = topics
+        return topics
+
     def publish_online(self) -> None:
         self.client.publish(
             self.availability_topic, payload="online", qos=1, retain=True
@@ -140,13 +182,25 @@ class MQTTClient(object):
             self.publish_partition_config(partition)
 
     def publish_partition_config(self, partition: Partition) -> None:
+        topics = self._get_partition_topics(partition)
+        config = self._partition_configs.get(partition.index)
+        if config is None:
+            config = self._build_partition_config(partition, topics)
+            self._partition_configs[partition.index] = config
+        self.client.publish(topics.config, config, qos=1, retain=True)
+        logger.debug(f"Published Partition {partition.index} config.")
+
+    def _build_partition_config(
+        self, partition: Partition, topics: PartitionTopics
+    ) -> bytes:
+        unique_id = f"{self.panel_unique_id}_{partition.unique_name}"
         partition_config = {
             "name": None,
             "device_class": "alarm_control_panel",
-            "unique_id": f"{self.panel_unique_id}_{partition.unique_name}",
+            "unique_id": unique_id,
             "device": {
                 "name": f"{self.panel_name} Partition {partition.index}",
-                "identifiers": [f"{self.panel_unique_id}_{partition.unique_name}"],
+                "identifiers": [unique_id],
                 "manufacturer": "Caddx",
                 "model": "NX8E",
             },
@@ -156,7 +210,7 @@ class MQTTClient(object):
             "code_arm_required": False,
             "code_disarm_required": False,
             "code_trigger_required": False,
-            "~": f"{self.topic_prefix_panel}/{partition.unique_name}",
+            "~": topics.base,
             "availability_topic": self.availability_topic,
             "payload_available": "online",
             "payload_not_available": "offline",
@@ -165,84 +219,92 @@ class MQTTClient(object):
             "json_attributes_topic": "~/attributes",
             "retain": True,
         }
-        config_topic = f"{self.topic_prefix_panel}/{partition.unique_name}/config"
-        self.client.publish(
-            config_topic, json.dumps(partition_config), qos=1, retain=True
-        )
-        logger.debug(f"Published Partition {partition.index} config.")
+        return self._encode_config(partition_config)
 
     def publish_zone_config(self, zone: Zone) -> None:
+        topics = self._get_zone_topics(zone)
+        configs = self._zone_configs.get(zone.index)
+        if configs is None:
+            configs = self._build_zone_configs(zone, topics)
+            self._zone_configs[zone.index] = configs
+        config_bypass, config_faulted, config_trouble = configs
+        self.client.publish(topics.config_bypass, config_bypass, qos=1, retain=True)
+        self.client.publish(topics.config_faulted, config_faulted, qos=1, retain=True)
+        self.client.publish(topics.config_trouble, config_trouble, qos=1, retain=True)
+        logger.debug(f"Published Zone {zone.index} config.")
+
+    def _build_zone_configs(
+        self, zone: Zone, topics: ZoneTopics
+    ) -> Tuple[bytes, bytes, bytes]:
         # The zone config defines three entities for the zone:
         # 1. A binary sensor for the zone's bypass status
         # 2. A binary sensor for the zone's fault status
         # 3. A binary sensor for the zone's trouble status
+        # All three entities belong to the same device.
+        device_id = f"{self.panel_unique_id}_{zone.unique_name}"
         zone_config_bypass = {
             "name": "Bypass",
             "device_class": "safety",
-            "unique_id": f"{self.panel_unique_id}_{zone.unique_name}_bypass",
+            "unique_id": f"{device_id}_bypass",
             "device": {
                 "name": zone.name,
-                "identifiers": [f"{self.panel_unique_id}_{zone.unique_name}"],
+                "identifiers": [device_id],
                 "manufacturer": "Caddx",
                 "model": "NX8E",
             },
             "origin": {"name": "Caddx MQTT Controller", "sw_version": "1.0.0"},
-            "state_topic": f"{self.topic_prefix_zones}/{zone.unique_name}/state",
+            "state_topic": topics.state,
             "value_template": "{{ value_json.bypassed }}",
             "availability_topic": self.availability_topic,
             "payload_available": "online",
             "payload_not_available": "offline",
             "retain": True,
         }
-        config_topic = f"{self.topic_prefix_zones}/{zone.unique_name}_bypass/config"
-        self.client.publish(
-            config_topic, json.dumps(zone_config_bypass), qos=1, retain=True
-        )
         zone_config_faulted = {
             "name": "Faulted",
             "device_class": "safety",
-            "unique_id": f"{self.panel_unique_id}_{zone.unique_name}_faulted",
+            "unique_id": f"{device_id}_faulted",
             "device": {
                 "name": zone.name,
-                "identifiers": [f"{self.panel_unique_id}_{zone.unique_name}"],
+                "identifiers": [device_id],
                 "manufacturer": "Caddx",
                 "model": "NX8E",
             },
             "origin": {"name": "Caddx MQTT Controller", "sw_version": "1.0.0"},
-            "state_topic": f"{self.topic_prefix_zones}/{zone.unique_name}/state",
+            "state_topic": topics.state,
             "value_template": "{{ value_json.faulted }}",
             "availability_topic": self.availability_topic,
             "payload_available": "online",
             "payload_not_available": "offline",
             "retain": True,
         }
-        config_topic = f"{self.topic_prefix_zones}/{zone.unique_name}_faulted/config"
-        self.client.publish(
-            config_topic, json.dumps(zone_config_faulted), qos=1, retain=True
-        )
         zone_config_trouble = {
             "name": "Trouble",
             "device_class": "problem",
-            "unique_id": f"{self.panel_unique_id}_{zone.unique_name}_trouble",
+            "unique_id": f"{device_id}_trouble",
             "device": {
                 "name": zone.name,
-                "identifiers": [f"{self.panel_unique_id}_{zone.unique_name}"],
+                "identifiers": [device_id],
                 "manufacturer": "Caddx",
                 "model": "NX8E",
             },
             "origin": {"name": "Caddx MQTT Controller", "sw_version": "1.0.0"},
-            "state_topic": f"{self.topic_prefix_zones}/{zone.unique_name}/state",
+            "state_topic": topics.state,
             "value_template": "{{ value_json.trouble }}",
             "availability_topic": self.availability_topic,
             "payload_available": "online",
             "payload_not_available": "offline",
             "retain": True,
         }
-        config_topic = f"{self.topic_prefix_zones}/{zone.unique_name}_trouble/config"
-        self.client.publish(
-            config_topic, json.dumps(zone_config_trouble), qos=1, retain=True
+        return (
+            self._encode_config(zone_config_bypass),
+            self._encode_config(zone_config_faulted),
+            self._encode_config(zone_config_trouble),
         )
-        logger.debug(f"Published Zone {zone.index} config.")
+
+    @staticmethod
+    def _encode_config(config: dict) -> bytes:
+        return json.dumps(config, separators=(",", ":")).encode("utf-8")
 
     def publish_zone_configs(self) -> None:
         zones = Zone.get_all_zones()
@@ -253,30 +315,54 @@ class MQTTClient(object):
     def publish_zone_states(self) -> None:
         zones = Zone.get_all_zones()
         for zone in zones:
-            time.sleep(1)
-            self.publish_zone_state(zone)
+            # Only pace actual publishes, so unchanged zones don't stall the control loop.
+            if self.publish_zone_state(zone):
+                time.sleep(1)
 
-    def publish_zone_state(self, zone: Zone) -> None:
+    def publish_zone_state(self, zone: Zone) -> bool:
+        # All three zone entities read one retained state message, so a change is a
+        #  single publish. Returns True if a message was published.
         if not zone.is_updated:
-            return
-        state = {
-            "bypassed": "ON" if zone.is_bypassed else "OFF",
-            "faulted": "ON" if zone.is_faulted else "OFF",
-            "trouble": "ON" if zone.is_trouble else "OFF",
-        }
-        state_topic = f"{self.topic_prefix_zones}/{zone.unique_name}/state"
-        self.client.publish(state_topic, json.dumps(state), qos=1, retain=True)
+            return False
         zone.is_updated = False
+        state = zone.state
+        if state == self._zone_published_states.get(zone.index):
+            logger.debug(f"Zone {zone.index} state unchanged. Not publishing.")
+            return False
+        self.client.publish(
+            self._get_zone_topics(zone).state,
+            Zone.state_payload(state),
+            qos=1,
+            retain=True,
+        )
+        self._zone_published_states[zone.index] = state
         logger.debug(f"Published Zone {zone.index} state.")
+        return True
 
     def publish_partition_states(self) -> None:
+        # Full resync (initial sync, hourly refresh, HA restart), so every partition is
+        #  republished even if its state has not changed.
+        self._partition_published_states.clear()
         partitions = Partition.get_all_partitions()
         for partition in partitions:
             self.publish_partition_state(partition)
 
-    def publish_partition_state(self, partition: Partition) -> None:
+    def publish_partition_state(self, partition: Partition) -> bool:
+        # The panel often resends unchanged status. Returns True if a message was published.
         state = partition.state
-        if state is not None:
-            state_topic = f"{self.topic_prefix_panel}/{partition.unique_name}/state"
-            self.client.publish(state_topic, state.value[0], qos=1, retain=True)
+        if state is None:
+            return False
+        if state == self._partition_published_states.get(partition.index):
+            logger.debug(
+                f"Partition {partition.index} state unchanged. Not publishing."
+            )
+            return False
+        self.client.publish(
+            self._get_partition_topics(partition).state,
+            state.value[0],
+            qos=1,
+            retain=True,
+        )
+        self._partition_published_states[partition.index] = state
         logger.debug(f"Published Partition {partition.index} state.")
+        return True
@@ -1,5 +1,10 @@
-from typing import Dict, Optional, ValuesView, Callable
+from __future__ import annotations
+
+from typing import Dict, Final, List, Optional, Callable
 from enum import Enum, IntEnum
+import sys
+
+MAX_PARTITIONS: Final = 8
 
 
 class PartitionConditionFlags(IntEnum):
@@ -95,7 +100,28 @@ class PartitionConditionFlags(IntEnum):
     DelayTripInProgress = 0b_10000000_00000000_00000000_00000000_00000000_00000000
 
 
+# Interned unique names by partition number.
+_UNIQUE_NAMES: Final = tuple(
+    sys.intern(f"partition_{i}") for i in range(MAX_PARTITIONS + 1)
+)
+_CONDITION_FLAGS_LIST: Final = tuple((f.value, f.name) for f in PartitionConditionFlags)
+# Only these condition flags affect the derived partition state.
+_STATE_FLAGS_MASK: Final = int(
+    PartitionConditionFlags.SirenOn
+    | PartitionConditionFlags.SteadySirenOn
+    | PartitionConditionFlags.Armed
+    | PartitionConditionFlags.Exit1
+    | PartitionConditionFlags.Exit2
+    | PartitionConditionFlags.Entry
+    | PartitionConditionFlags.Entryguard
+    | PartitionConditionFlags.ReadyToArm
+    | PartitionConditionFlags.ReadyToForceArm
+)
+
+
 class Partition(object):
+    __slots__ = ("index", "unique_name", "mask_bit", "_condition_flags", "_state")
+
     class State(Enum):
         DISARMED = ("disarmed",)
         ARMED_HOME = ("armed_home",)
@@ -105,58 +131,92 @@ class Partition(object):
         ARMING = ("arming",)
         DISARMING = "disarming"
 
-    partition_by_index: Dict[int, "Partition"] = {}
-    partition_by_unique_name: Dict[str, "Partition"] = {}
+    # Slot 0 is unused so that partitions can be indexed directly by partition number.
+    partition_by_index: List[Optional[Partition]] = [None] * (MAX_PARTITIONS + 1)
+    partition_by_unique_name: Dict[str, Partition] = {}
 
     @classmethod
-    def get_partition_by_index(cls, index: int) -> Optional["Partition"]:
-        return cls.partition_by_index.get(index)
+    def get_partition_by_index(cls, index: int) -> Optional[Partition]:
+        return cls.partition_by_index[index] if 0 < index <= MAX_PARTITIONS else None
 
     @classmethod
-    def get_partition_by_unique_name(cls, unique_name: str) -> Optional["Partition"]:
+    def get_partition_by_unique_name(cls, unique_name: str) -> Optional[Partition]:
         return cls.partition_by_unique_name.get(unique_name)
 
     @classmethod
-    def get_all_partitions(cls) -> ValuesView["Partition"]:
-        return cls.partition_by_index.values()
+    def get_all_partitions(cls) -> List[Partition]:
+        return [p for p in cls.partition_by_index if p is not None]
 
     def __init__(self, index: int):
         self.index = index
-        assert 1 <= index <= 8
-        self.unique_name = f"partition_{self.index}"
-        assert index not in self.partition_by_index, "Non-unique partition index"
+        assert 1 <= index <= MAX_PARTITIONS
+        self.unique_name = _UNIQUE_NAMES[index]
+        # Bit for this partition in zone partition masks and keypad commands.
+        self.mask_bit = 1 << (index - 1)
+        assert self.partition_by_index[index] is None, "Non-unique partition index"
         self.__class__.partition_by_index[index] = self
         self.__class__.partition_by_unique_name[self.unique_name] = self
-        self.condition_flags: Optional[int] = None
+        self._condition_flags: Optional[int] = None
+        self._state: Optional[Partition.State] = None
 
     @property
-    def state(self) -> Optional["Partition.State"]:
-        if self.condition_flags is None:
-            return None
-        if (self.condition_flags & PartitionConditionFlags.SirenOn) or (
-            self.condition_flags & PartitionConditionFlags.SteadySirenOn
-        ):
-            return Partition.State.TRIGGERED
-        if self.condition_flags & PartitionConditionFlags.Armed:
-            if (self.condition_flags & PartitionConditionFlags.Exit1) or (
-                self.condition_flags & PartitionConditionFlags.Exit2
-            ):
-                return Partition.State.ARMING
-            if self.condition_flags & PartitionConditionFlags.Entry:
-                return Partition.State.PENDING
-            if self.condition_flags & PartitionConditionFlags.Entryguard:
-                return Partition.State.ARMED_HOME
-            else:
-                return Partition.State.ARMED_AWAY
-        if (self.condition_flags & PartitionConditionFlags.ReadyToArm) or (
-            self.condition_flags & PartitionConditionFlags.ReadyToForceArm
-        ):
-            return Partition.State.DISARMED
+    def condition_flags(self) -> Optional[int]:
+        return self._condition_flags
+
+    @condition_flags.setter
+    def condition_flags(self, value: Optional[int]) -> None:
+        # State is derived here once, since it is read far more often than the flags change.
+        if value == self._condition_flags:
+            return
+        self._condition_flags = value
+        self._state = None if value is None else _STATE_LUT[value & _STATE_FLAGS_MASK]
+
+    @property
+    def state(self) -> Optional[Partition.State]:
+        return self._state
 
     def log_condition(self, logger: Callable[[str], None]) -> None:
         logger(f"Partition {self.index} raw value: {self.condition_flags:0>12x}")
-        log_entry = f"Partition {self.index} conditions: "
-        for flag in PartitionConditionFlags:
-            if flag & self.condition_flags:
-                log_entry += f"{flag.name} "
-        logger(log_entry)
+        names = " ".join(
+            name
+            for value, name in _CONDITION_FLAGS_LIST
+            if self.condition_flags & value
+        )
+        logger(f"Partition {self.index} conditions: {names}")
+
+
+def _derive_state(condition_flags: int) -> Optional[Partition.State]:
+    if (condition_flags & PartitionConditionFlags.SirenOn) or (
+        condition_flags & PartitionConditionFlags.SteadySirenOn
+    ):
+        return Partition.State.TRIGGERED
+    if condition_flags & PartitionConditionFlags.Armed:
+        if (condition_flags & PartitionConditionFlags.Exit1) or (
+            condition_flags & PartitionConditionFlags.Exit2
+        ):
+            return Partition.State.ARMING
+        if condition_flags & PartitionConditionFlags.Entry:
+            return Partition.State.PENDING
+        if condition_flags & PartitionConditionFlags.Entryguard:
+            return Partition.State.ARMED_HOME
+        else:
+            return Partition.State.ARMED_AWAY
+    if (condition_flags & PartitionConditionFlags.ReadyToArm) or (
+        condition_flags & PartitionConditionFlags.ReadyToForceArm
+    ):
+        return Partition.State.DISARMED
+    return None
+
+
+def _build_state_lut() -> Dict[int, Optional[Partition.State]]:
+    # Evaluate the state rules once for every combination of the relevant flags.
+    lut = {}
+    key = _STATE_FLAGS_MASK
+    while True:
+        lut[key] = _derive_state(key)
+        if key == 0:
+            return lut
+        key = (key - 1) & _STATE_FLAGS_MASK
+
+
+_STATE_LUT: Final = _build_state_lut()
@@ -1,9 +1,19 @@
-from typing import Dict, Optional, ValuesView
+from __future__ import annotations
+
+from typing import Final, List, NamedTuple, Optional
 from enum import IntEnum
 import logging
+import sys
 
 logger = logging.getLogger("app.zone")
 
+# Panel zone numbers are a single byte (0-255), so server zones run 1-256.
+MAX_ZONES: Final = 256
+
+
+# Interned unique names by zone number.
+_UNIQUE_NAMES: Final = tuple(sys.intern(f"zone_{i:03}") for i in range(MAX_ZONES + 1))
+
 
 class ZoneTypeFlags(IntEnum):
     Fire = 0b_00000000_00000000_00000001  # Zone is a fire zone.
@@ -52,77 +62,144 @@ class ZoneConditionFlags(IntEnum):
     )
 
 
+class ZoneStatePayload(NamedTuple):
+    bypassed: bool
+    faulted: bool
+    trouble: bool
+
+
+# Flag tables built once at import, so the hot paths only test plain ints.
+_BYPASSED: Final = int(ZoneConditionFlags.Bypassed)
+_FAULTED: Final = int(ZoneConditionFlags.Faulted)
+# Tampered, trouble, low battery or lost supervision all report as zone trouble.
+_TROUBLE_MASK: Final = int(
+    ZoneConditionFlags.Tampered
+    | ZoneConditionFlags.Trouble
+    | ZoneConditionFlags.LowBattery
+    | ZoneConditionFlags.SupervisionLost
+)
+_CONDITION_AGGREGATE: Final = _BYPASSED | _FAULTED | _TROUBLE_MASK
+_TYPE_FLAGS_LIST: Final = tuple((f.value, f.name) for f in ZoneTypeFlags)
+_COND_FLAGS_LIST: Final = tuple((f.value, f.name) for f in ZoneConditionFlags)
+
+
 class Zone(object):
-    zones_by_index: Dict[int, "Zone"] = {}
-    zones_by_unique_name: Dict[str, "Zone"] = {}
+    __slots__ = (
+        "index",
+        "name",
+        "unique_name",
+        "_partition_mask",
+        "_condition_mask",
+        "_type_mask",
+        "_is_bypassed",
+        "_is_faulted",
+        "_is_trouble",
+        "is_updated",
+    )
+
+    # Zone state JSON for MQTT, formatted without going through the json encoder.
+    _STATE_TMPL: Final = b'{"bypassed":"%s","faulted":"%s","trouble":"%s"}'
+    # Indexed by bool: False -> OFF, True -> ON.
+    _ON_OFF: Final = (b"OFF", b"ON")
+
+    # Slot 0 is unused so that zones can be indexed directly by zone number.
+    zones_by_index: List[Optional[Zone]] = [None] * (MAX_ZONES + 1)
 
     @classmethod
-    def get_zone_by_index(cls, zone_id: int) -> Optional["Zone"]:
-        return cls.zones_by_index.get(zone_id)
+    def get_zone_by_index(cls, zone_id: int) -> Optional[Zone]:
+        return cls.zones_by_index[zone_id] if 0 < zone_id <= MAX_ZONES else None
 
     @classmethod
-    def get_zone_by_unique_name(cls, unique_name: str) -> Optional["Zone"]:
-        return cls.zones_by_unique_name.get(unique_name)
+    def get_zone_by_unique_name(cls, unique_name: str) -> Optional[Zone]:
+        if not unique_name.startswith("zone_"):
+            return None
+        try:
+            zone = cls.get_zone_by_index(int(unique_name[5:]))
+        except ValueError:
+            return None
+        if zone is None or zone.unique_name != unique_name:
+            return None
+        return zone
 
     @classmethod
-    def get_all_zones(cls) -> ValuesView["Zone"]:
-        return cls.zones_by_index.values()
+    def get_all_zones(cls) -> List[Zone]:
+        return [zone for zone in cls.zones_by_index if zone is not None]
 
     def __init__(self, index: int, name: str) -> None:
+        if not 0 < index <= MAX_ZONES:
+            raise ValueError(f"Zone index {index} out of range")
+        if self.__class__.zones_by_index[index] is not None:
+            raise ValueError(f"Non-unique zone index {index}")
         self.index = index
         self.name = name
-        self.unique_name = f"zone_{self.index :03}"
+        self.unique_name = _UNIQUE_NAMES[index]
         self._partition_mask: int = 0
         self._condition_mask: int = 0
         self._type_mask: int = 0
+        # Decoded once in set_masks() so the condition properties are plain reads.
+        self._is_bypassed: bool = False
+        self._is_faulted: bool = False
+        self._is_trouble: bool = False
         self.is_updated: bool = False
-        assert index not in self.zones_by_index, "Non-unique zone index"
-        assert (
-            self.unique_name not in self.zones_by_unique_name
-        ), "Non-unique zone unique name"
         self.__class__.zones_by_index[index] = self
-        self.__class__.zones_by_unique_name[self.unique_name] = self
 
     @property
     def is_bypassed(self) -> bool:
-        return bool(ZoneConditionFlags.Bypassed & self._condition_mask)
+        return self._is_bypassed
 
     @property
     def is_faulted(self) -> bool:
-        return bool(ZoneConditionFlags.Faulted & self._condition_mask)
+        return self._is_faulted
 
     @property
     def is_trouble(self) -> bool:
-        # Return True if tampered, trouble, low battery, or supervision lost
-        return bool(
-            ZoneConditionFlags.Tampered & self._condition_mask
-            or ZoneConditionFlags.Trouble & self._condition_mask
-            or ZoneConditionFlags.LowBattery & self._condition_mask
-            or ZoneConditionFlags.SupervisionLost & self._condition_mask
+        return self._is_trouble
+
+    @property
+    def state(self) -> ZoneStatePayload:
+        return ZoneStatePayload(self._is_bypassed, self._is_faulted, self._is_trouble)
+
+    @classmethod
+    def state_payload(cls, state: ZoneStatePayload) -> bytes:
+        return cls._STATE_TMPL % (
+            cls._ON_OFF[state.bypassed],
+            cls._ON_OFF[state.faulted],
+            cls._ON_OFF[state.trouble],
         )
 
     def is_valid_partition(self, partition) -> bool:
         # Check if the bit for this partition is set in the partition mask for this zone
-        return bool(self._partition_mask & (1 << (partition.index - 1)))
+        return bool(self._partition_mask & partition.mask_bit)
 
     def set_masks(
         self, partition_mask: int, type_mask: int, condition_mask: int
     ) -> None:
         self._partition_mask = partition_mask
         self._type_mask = type_mask
+        # Only re-derive the state booleans when a bit that feeds them has changed.
+        if (condition_mask ^ self._condition_mask) & _CONDITION_AGGREGATE:
+            self._is_bypassed = bool(condition_mask & _BYPASSED)
+            self._is_faulted = bool(condition_mask & _FAULTED)
+            self._is_trouble = bool(condition_mask & _TROUBLE_MASK)
         self._condition_mask = condition_mask
         self.is_updated = True
         self.debug_zone_status()
 
     def debug_zone_status(self):
-        if logger.level > logging.DEBUG:
+        if not logger.isEnabledFor(logging.DEBUG):
             return
-        logger.debug(f"Zone {self.index} - {self.name}")
-        logger.debug(f"  Type mask: {self._type_mask:0>24b}")
-        for flag in ZoneTypeFlags:
-            if flag & self._type_mask:
-                logger.debug(f"    {flag.name} is set")
-        logger.debug(f"  Condition flags: {self._condition_mask:0>16b}")
-        for flag in ZoneConditionFlags:
-            if flag & self._condition_mask:
-                logger.debug(f"    {flag.name} is set")
+        type_names = " ".join(
+            name for value, name in _TYPE_FLAGS_LIST if self._type_mask & value
+        )
+        condition_names = " ".join(
+            name for value, name in _COND_FLAGS_LIST if self._condition_mask & value
+        )
+        logger.debug(
+            "Zone %d - %s type=%s [%s] condition=%s [%s]",
+            self.index,
+            self.name,
+            format(self._type_mask, "024b"),
+            type_names,
+            format(self._condition_mask, "016b"),
+            condition_names,
+        )